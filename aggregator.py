@@ -6,23 +6,40 @@ Created on Mon Aug 25 07:38:47 2025
 """
 """End‑to‑end orchestrator for the fuel pipeline."""
 from pathlib import Path
+import argparse
 import logging
 import sqlite3
+import threading
 import os
+import numpy as np
 import pandas as pd
 
-from setup import load_config, init_database, build_runtime_frames, inflation_constants
+from setup import load_config, init_database, build_cost_frame, build_run_dimensions, inflation_constants
 from eia_api import load_cached, fetch_and_cache
 from techcom import build_comm_and_tech
 from efficiency import build_mapping, add_efficiency
 from costvariable import build_costvariable
 from emissionactivity import build_emission_activity
 from postprocessing import add_metadata
+from catalog import InputCatalog
+from sensitivity import LAYOUTS, build_costvariable_samples, clear_samples
+from scheduler import Stage, run_stages, critical_path, prune
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# SQLite allows one writer at a time; write stages queue on this lock
+_WRITE_LOCK = threading.Lock()
 
-def _write_all(db_path: Path, comb_dict: dict) -> None:
+
+def _write_all(
+    db_path: Path, comb_dict: dict, only: list[str] | None = None, replace: bool = False, clear: bool = False
+) -> None:
+    """Append the registry frames (``only`` those tables, if given) to the DB.
+
+    With ``replace`` each table's old rows are deleted on the same connection
+    and in the same transaction as its insert, so a table is never left empty
+    by a failed run. ``clear`` also removes earlier sensitivity samples.
+    """
     def _to_scalar(x):
         # Collapse weird pandas objects to simple scalars/strings
         import pandas as pd
@@ -34,19 +51,60 @@ def _write_all(db_path: Path, comb_dict: dict) -> None:
             return str(x)
         return x
 
-    with sqlite3.connect(db_path) as conn:
+    with _WRITE_LOCK, sqlite3.connect(db_path) as conn:
         for table, df in comb_dict.items():
+            if only is not None and table not in only:
+                continue
+            if replace:
+                conn.execute(f'DELETE FROM "{table}"')
+                if clear:
+                    clear_samples(conn)
+                    clear = False
             if isinstance(df, pd.DataFrame) and not df.empty:
                 safe_df = df.applymap(_to_scalar)
                 logging.info("Writing %-24s %6d rows", table, len(safe_df))
                 safe_df.to_sql(table, conn, if_exists='append', index=False)
 
 
-def run() -> None:
-    cfg = load_config()
-    db_path, tables, comb_dict = init_database(cfg)
-
-    # Source (EIA)
+def _column_array(col: pd.Series) -> np.ndarray:
+    """Column as an array ready for ``executemany``; missing text becomes ``None``."""
+    if col.dtype.kind in 'iuf':
+        return col.to_numpy()
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # Look the codes up in the categories (code -1 hits the trailing None)
+        lookup = np.append(np.asarray(col.cat.categories, dtype=object), None)
+        return lookup[col.cat.codes.to_numpy()]
+    return col.astype(object).where(col.notna(), None).to_numpy()
+
+
+def _write_bulk(db_path: Path, comb_dict: dict, chunk: int = 200_000, clear: bool = False) -> None:
+    """Append large, already-clean frames (sensitivity samples) in one transaction.
+
+    Skips ``_to_scalar``/``to_sql`` and binds plain column lists through
+    ``executemany``; tables missing from the schema are created from dtypes.
+    ``clear`` first removes earlier samples in the same transaction.
+    """
+    sql_types = {'i': 'INTEGER', 'u': 'INTEGER', 'f': 'REAL'}
+    with _WRITE_LOCK, sqlite3.connect(db_path) as conn:
+        if clear:
+            clear_samples(conn)
+        for table, df in comb_dict.items():
+            if not isinstance(df, pd.DataFrame) or df.empty:
+                continue
+            logging.info("Writing %-24s %6d rows", table, len(df))
+            cols = ', '.join(f'"{c}"' for c in df.columns)
+            decl = ', '.join(f'"{c}" {sql_types.get(t.kind, "TEXT")}' for c, t in df.dtypes.items())
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({decl})')
+            insert = f'INSERT INTO "{table}" ({cols}) VALUES ({", ".join("?" * len(df.columns))})'
+            # ``chunk`` counts bound values, so wide frames get fewer rows per batch
+            step = max(1, chunk // len(df.columns))
+            arrays = [_column_array(df[c]) for c in df.columns]
+            for start in range(0, len(df), step):
+                conn.executemany(insert, zip(*(a[start:start + step].tolist() for a in arrays)))
+
+
+def _load_eia(cfg: dict) -> pd.DataFrame:
+    """Load the EIA cache, fetching from the API when it is missing."""
     cache_path = Path('cache/dataframes.pkl')
     try:
         df_raw = load_cached(cache_path)
@@ -55,51 +113,135 @@ def run() -> None:
         api_key = os.getenv('EIA_API_KEY')
         df_raw = fetch_and_cache(int(cfg['eia_year']), api_key, cache_path)
         logging.info("Fetched & cached EIA: %d rows", len(df_raw))
-
-    # Build runtime frames
-    cost_df, fuel_df, fuel_list, province_list, periods, dict_id = build_runtime_frames(df_raw, cfg)
-
-    # Dimensions
-    comb_dict, tech_list = build_comm_and_tech(
-        comb_dict, cost_df=cost_df, fuel_df=fuel_df, fuel_list=fuel_list, dict_id=dict_id
-    )
-
-    # Efficiency (unit) and mapping
-    comb_dict = add_efficiency(
-        comb_dict, province_list=province_list, periods=periods, dict_id=dict_id, tech_list=tech_list
-    )
-    mapping = build_mapping(tech_list)
-
-    # Costs
-    factors = inflation_constants()
-    comb_dict = build_costvariable(
-        comb_dict,
-        cost_df=cost_df,
-        tech_list=tech_list,
-        mapping=mapping,
-        province_list=province_list,
-        periods=periods,
-        dict_id=dict_id,
-        factors=factors,
-        fuel_df=fuel_df.rename(columns={'Fuel_type': 'Commodity', 'Fuel_name': 'notes'}).assign(source='[F1]'),
-    )
-
-    # Emissions
-    comb_dict = build_emission_activity(
-        comb_dict,
-        province_list=province_list,
-        periods=periods,
-        dict_id=dict_id,
-        mapping=mapping,
-    )
-
-    # Metadata
-    comb_dict = add_metadata(comb_dict, config=cfg, dict_id=dict_id, province_list=province_list)
-
-    # Persist
-    _write_all(db_path, comb_dict)
-    logging.info("Done. SQLite written to: %s", db_path)
+    return df_raw
+
+
+def _load_catalog() -> tuple:
+    """Validated reference data and the views the builders consume."""
+    catalog = InputCatalog()
+    # CostVariable cites the fuel name, sourced to the EIA AEO ([F1])
+    cost_notes = {c: (name, '[F1]') for c, name in catalog.fuel_names().items()}
+    return catalog.fuel_df, cost_notes, catalog.emission_factors()
+
+
+def pipeline_stages(
+    tables: list[str] | None = None, samples: int = 0, seed: int | None = None, layout: str | None = None
+) -> list[Stage]:
+    """Declare the pipeline as a DAG of stages.
+
+    Builders that only need ``mapping`` run side by side in worker
+    processes; each finished table is written by its own ``write_*`` stage
+    while the remaining builders are still computing. With ``samples`` > 0 a
+    Monte Carlo CostVariable stage is added (see :mod:`sensitivity`).
+
+    ``tables`` restricts the run to those tables: stages they do not need
+    (including the EIA load, if nothing selected depends on it) are pruned,
+    and only those tables are replaced in the existing database. Old rows
+    are deleted by the write that replaces them, never up front.
+    """
+    runtime = {'province_list': 'province_list', 'periods': 'periods', 'dict_id': 'dict_id'}
+    stages = [
+        # Sources: the EIA load overlaps with schema creation and the catalog
+        Stage('config', load_config, outputs=('cfg',)),
+        Stage('init_database', init_database, inputs={'config': 'cfg'}, outputs=('db_path', 'tables', 'schema'),
+              static={'replace': sorted(tables) if tables is not None else None}),
+        Stage('eia', _load_eia, inputs={'cfg': 'cfg'}, outputs=('df_raw',)),
+        Stage('catalog', _load_catalog, outputs=('catalog_fuel_df', 'cost_notes', 'emission_factors')),
+        Stage('cost_frame', build_cost_frame, inputs={'df_raw': 'df_raw', 'config': 'cfg'}, outputs=('cost_df',)),
+        Stage('run_dimensions', build_run_dimensions, inputs={'config': 'cfg', 'fuel_df': 'catalog_fuel_df'},
+              outputs=('fuel_df', 'fuel_list', 'province_list', 'periods', 'dict_id')),
+        Stage('factors', inflation_constants, outputs=('factors',)),
+
+        # Dimensions and mapping
+        Stage('comm_and_tech', build_comm_and_tech,
+              inputs={'fuel_df': 'fuel_df', 'fuel_list': 'fuel_list', 'dict_id': 'dict_id'},
+              outputs=('dimensions', 'tech_list'), tables=('Commodity', 'Technology')),
+        Stage('mapping', build_mapping, inputs={'tech_list': 'tech_list'}, outputs=('mapping',)),
+
+        # Independent builders
+        Stage('efficiency', add_efficiency, inputs={**runtime, 'tech_list': 'tech_list'},
+              outputs=('efficiency',), executor='process', tables=('Efficiency',)),
+        Stage('costvariable', build_costvariable,
+              inputs={**runtime, 'cost_df': 'cost_df', 'tech_list': 'tech_list', 'mapping': 'mapping',
+                      'factors': 'factors', 'notes': 'cost_notes', 'config': 'cfg'},
+              outputs=('costvariable',), executor='process', tables=('CostVariable',)),
+        Stage('emission_activity', build_emission_activity,
+              inputs={**runtime, 'mapping': 'mapping', 'emission_factors': 'emission_factors'},
+              outputs=('emission_activity',), executor='process', tables=('EmissionActivity',)),
+        Stage('metadata', add_metadata,
+              inputs={'config': 'cfg', 'dict_id': 'dict_id', 'province_list': 'province_list'},
+              outputs=('metadata',), tables=('DataSet', 'DataSource', 'SectorLabel')),
+    ]
+
+    built = [t for st in stages for t in st.tables]
+    if tables is not None and set(tables) - set(built):
+        raise ValueError(f"Unknown tables {sorted(set(tables) - set(built))}; choose from {built}")
+
+    # Persist each registry slice as soon as it is built (selected tables only).
+    # Replacing CostVariable or DataSet also drops the samples derived from them;
+    # sample writes wait for those writes so they are not deleted in turn.
+    writes, sample_parents = [], []
+    for st in [st for st in stages if st.tables]:
+        only = [t for t in st.tables if tables is None or t in tables]
+        if only:
+            art = st.outputs[0]
+            writes.append(f'write_{art}')
+            parent = bool({'CostVariable', 'DataSet'} & set(only))
+            if parent:
+                sample_parents.append(f'write_{art}')
+            stages.append(Stage(f'write_{art}', _write_all, inputs={'db_path': 'db_path', 'comb_dict': art},
+                                static={'only': only, 'replace': tables is not None,
+                                        'clear': tables is not None and parent}))
+
+    if samples > 0:
+        writes.append('write_costvariable_samples')
+        stages += [
+            Stage('costvariable_samples', build_costvariable_samples,
+                  inputs={**runtime, 'cost_df': 'cost_df', 'tech_list': 'tech_list', 'mapping': 'mapping',
+                          'factors': 'factors', 'notes': 'cost_notes', 'config': 'cfg'},
+                  outputs=('costvariable_samples',), executor='process', tables=('CostVariable', 'DataSet'),
+                  static={'n_samples': samples, 'seed': seed, 'layout': layout}),
+            Stage('write_costvariable_samples', _write_bulk,
+                  inputs={'db_path': 'db_path', 'comb_dict': 'costvariable_samples'},
+                  static={'clear': tables is not None}, after=tuple(sample_parents)),
+        ]
+    return prune(stages, writes)
+
+
+def selectable_tables() -> list[str]:
+    """Tables the pipeline builds, i.e. valid ``--tables`` choices."""
+    return [t for st in pipeline_stages() for t in st.tables]
+
+
+def run(
+    max_workers: int | None = None,
+    tables: list[str] | None = None,
+    samples: int = 0,
+    seed: int | None = None,
+    layout: str | None = None,
+) -> None:
+    stages = pipeline_stages(tables=tables, samples=samples, seed=seed, layout=layout)
+    if tables is not None:
+        logging.info("Selected tables: %s (%d stages)", ", ".join(tables), len(stages))
+    artifacts, timings = run_stages(stages, max_workers=max_workers)
+
+    path = critical_path(stages, timings)
+    wall = max(end for _, end in timings.values())
+    logging.info("Critical path (%.2fs wall): %s", wall, " -> ".join(
+        f"{name} [{timings[name][1] - timings[name][0]:.2f}s]" for name in path
+    ))
+    logging.info("Done. SQLite written to: %s", artifacts['db_path'])
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="End-to-end orchestrator for the fuel pipeline.")
+    parser.add_argument('--workers', type=int, default=None, help="Max threads/processes per pool")
+    parser.add_argument('--tables', nargs='+', choices=selectable_tables(), default=None, metavar='TABLE',
+                        help="Only build these tables and replace them in the existing DB "
+                             f"({', '.join(selectable_tables())})")
+    parser.add_argument('--samples', type=int, default=0, help="Monte Carlo CostVariable samples (0 = off)")
+    parser.add_argument('--seed', type=int, default=None, help="Sampling seed (default: params.yaml)")
+    parser.add_argument('--layout', choices=LAYOUTS, default=None,
+                        help="Write samples as separate data_ids or one wide CostVariableSample table")
+    args = parser.parse_args()
+    run(max_workers=args.workers, tables=args.tables, samples=args.samples, seed=args.seed, layout=args.layout)
\ No newline at end of file
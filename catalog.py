@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:05:12 2026
+
+@author: david
+"""
+"""Input catalog for the CSV reference data.
+
+Each reference dataset under ``input/`` is declared once (columns, types,
+required fields, key). :func:`load_dataset` validates and types the CSV and
+caches the result as a pickle under ``cache/catalog``; the cache is reused
+until the file's SHA-256 (or the declaration) changes. :class:`InputCatalog`
+hands builders pre-indexed views instead of raw CSV frames.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+import hashlib
+import logging
+import pickle
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+CATALOG_CACHE = Path('cache/catalog')
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Declared schema of one reference CSV.
+
+    ``columns`` maps column name to ``'str'`` or ``'float'``; ``required``
+    columns may not be empty; rows repeating ``key`` are dropped (first kept),
+    or rejected when ``unique`` is set.
+    """
+    file: str
+    columns: Tuple[Tuple[str, str], ...]
+    required: Tuple[str, ...]
+    key: Tuple[str, ...]
+    unique: bool = False
+
+
+_EMISSION_COLUMNS = (
+    ('commodity', 'str'), ('emission', 'str'), ('value', 'float'),
+    ('units', 'str'), ('notes', 'str'), ('source', 'str'),
+)
+
+DATASETS: Dict[str, Dataset] = {
+    'fuel_list': Dataset(
+        file='fuel_list.csv',
+        columns=(
+            ('Commodity', 'str'), ('Fuel_type', 'str'), ('Fuel_name', 'str'),
+            ('fuel_price_label', 'str'), ('notes', 'str'), ('source', 'str'),
+        ),
+        required=('Commodity', 'Fuel_type', 'Fuel_name'),
+        key=('Commodity',),
+        unique=True,
+    ),
+    'upstream_emissions': Dataset(
+        file='upstream_emissions_fuels.csv',
+        columns=_EMISSION_COLUMNS,
+        required=('commodity', 'emission', 'value', 'units'),
+        key=('commodity', 'emission'),
+    ),
+    'direct_emissions': Dataset(
+        file='direct_comb_emission.csv',
+        columns=_EMISSION_COLUMNS,
+        required=('commodity', 'emission', 'value', 'units'),
+        key=('commodity', 'emission'),
+    ),
+}
+
+
+def _validate(name: str, spec: Dataset, df: pd.DataFrame) -> pd.DataFrame:
+    """Check columns, types, required fields and key; return the typed frame."""
+    names = [c for c, _ in spec.columns]
+    dup = df.columns[df.columns.duplicated()].tolist()
+    if dup:
+        raise ValueError(f"{spec.file}: duplicated columns {dup}")
+    missing = [c for c in names if c not in df.columns]
+    if missing:
+        raise ValueError(f"{spec.file}: missing columns {missing}")
+    df = df[names].copy()
+
+    for col, kind in spec.columns:
+        if kind == 'float':
+            try:
+                df[col] = pd.to_numeric(df[col]).astype(float)
+            except (TypeError, ValueError) as exc:
+                raise ValueError(f"{spec.file}: column {col!r} is not numeric") from exc
+
+    empty = [c for c in spec.required if df[c].isna().any()]
+    if empty:
+        raise ValueError(f"{spec.file}: empty values in required columns {empty}")
+
+    dups = df.duplicated(list(spec.key))
+    if dups.any():
+        keys = df.loc[dups, list(spec.key)].drop_duplicates().values.tolist()
+        if spec.unique:
+            raise ValueError(f"{spec.file}: duplicated key {spec.key} for {keys}")
+        logging.warning("%s: dropping %d rows repeating key %s: %s", name, int(dups.sum()), spec.key, keys)
+        df = df[~dups]
+    return df.reset_index(drop=True)
+
+
+def load_dataset(name: str, input_dir: str | Path = 'input', cache_dir: str | Path = CATALOG_CACHE) -> pd.DataFrame:
+    """Return the validated, typed frame for dataset ``name``.
+
+    The compiled frame is cached at ``cache_dir/<name>.pkl`` together with the
+    source file hash and the dataset declaration; either changing forces a
+    re-parse.
+    """
+    spec = DATASETS[name]
+    path = Path(input_dir) / spec.file
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    cache_path = Path(cache_dir) / f"{name}.pkl"
+
+    if cache_path.is_file():
+        try:
+            with cache_path.open('rb') as fh:
+                cached = pickle.load(fh)
+            if cached['sha256'] == digest and cached['spec'] == spec:
+                return cached['frame']
+        except (pickle.UnpicklingError, EOFError, KeyError, AttributeError):
+            logging.warning("Ignoring unreadable catalog cache: %s", cache_path)
+
+    # utf-8-sig strips the BOM Excel writes in front of the first header;
+    # text columns stay text even when every value looks numeric
+    text = {c: str for c, kind in spec.columns if kind == 'str'}
+    df = _validate(name, spec, pd.read_csv(path, encoding='utf-8-sig', dtype=text))
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with cache_path.open('wb') as fh:
+        pickle.dump({'sha256': digest, 'spec': spec, 'frame': df}, fh)
+    logging.info("Compiled %s: %d rows", spec.file, len(df))
+    return df
+
+
+class InputCatalog:
+    """Reference datasets loaded once, with the views builders need."""
+
+    def __init__(self, input_dir: str | Path = 'input', cache_dir: str | Path = CATALOG_CACHE):
+        self.frames: Dict[str, pd.DataFrame] = {
+            name: load_dataset(name, input_dir, cache_dir) for name in DATASETS
+        }
+
+    @property
+    def fuel_df(self) -> pd.DataFrame:
+        return self.frames['fuel_list']
+
+    @property
+    def fuel_list(self) -> List[str]:
+        return self.fuel_df['Commodity'].to_list()
+
+    def fuel_names(self) -> Dict[str, str]:
+        """Commodity → fuel name (e.g. ``'C_ng'`` → ``'natural gas'``)."""
+        return dict(zip(self.fuel_df['Commodity'], self.fuel_df['Fuel_name']))
+
+    def emission_factors(self) -> Dict[str, List[Tuple]]:
+        """Commodity → ``(emission, value, units, notes, source)`` tuples.
+
+        Upstream factors come first; a direct factor repeating an upstream
+        ``(commodity, emission)`` pair is dropped.
+        """
+        emis = pd.concat([self.frames['upstream_emissions'], self.frames['direct_emissions']])
+        emis = emis.drop_duplicates(subset=['commodity', 'emission'])
+        out: Dict[str, List[Tuple]] = {}
+        for rec in emis.itertuples(index=False):
+            out.setdefault(rec.commodity, []).append((rec.emission, rec.value, rec.units, rec.notes, rec.source))
+        return out
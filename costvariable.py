@@ -6,123 +6,106 @@ Created on Wed Aug 20 14:02:26 2025
 """
 
 """Compute CostVariable values from EIA price frame and config factors."""
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import pandas as pd
 
 
-def _calc_value(
-    tech: str,
-    tech_name: str,
-    period_val: int,
-    *,
-    cost_df: pd.DataFrame,
-    cfg: dict,
-    mmbtuconvertor: float,
-    currencyadjustment: float,
-    defl22: float,
-    defl25: float,
-    eth_price: float,
-    rdsl_price: float,
-    spk_price: float,
-) -> float:
-    """Encapsulate the branchy pricing logic from your script."""
+# Prices that do not come from the EIA series
+FIXED_PRICES = ('b_price', 'u_price', 'eth_price', 'rdsl_price', 'spk_price')
+
+
+def price_source(tech: str, tech_name: str) -> Tuple[str, str, float]:
+    """Encapsulate the branchy pricing logic from your script.
+
+    Returns
+    -------
+    (str, str, float)
+        ``(price_key, deflator, extra)``: ``price_key`` is one of
+        :data:`FIXED_PRICES` or the EIA ``Tech Name`` to look up; ``deflator``
+        names the factor applied after the $/MMBtu → M$/PJ conversion, or is
+        empty when the price is already in model units; ``extra`` is a final
+        multiplier.
+    """
     if 'BIO' in tech or 'WOOD' in tech:
-        return ((cfg['b_price'] * mmbtuconvertor) * currencyadjustment) * defl22
+        return 'b_price', 'deflation_2022', 1.0
     if 'U_NAT' in tech or 'U_ENR' in tech:
-        return ((cfg['u_price'] * mmbtuconvertor) * currencyadjustment) * defl22
+        return 'u_price', 'deflation_2022', 1.0
     if 'ETH' in tech:
-        return eth_price
+        return 'eth_price', '', 1.0
     if 'RDSL' in tech:
-        return rdsl_price
+        return 'rdsl_price', '', 1.0
     if 'SPK' in tech:
-        return spk_price
+        return 'spk_price', '', 1.0
 
     if any(x in tech for x in ['LNG', 'CNG', 'NGL']):
-        lookup = 'T_ng' if tech in ['F_T_LNG', 'F_T_CNG'] else 'I_prop'
-        base = cost_df.loc[
-            (cost_df['period'] == period_val) & (cost_df['Tech Name'] == lookup), 'value'
-        ].squeeze()
-        return ((base * mmbtuconvertor) * currencyadjustment) * defl25 * 0.89
-
+        return ('T_ng' if tech in ['F_T_LNG', 'F_T_CNG'] else 'I_prop'), 'deflation_2025', 0.89
     if 'LPG' in tech:
-        lookup = 'R_prop' if tech == 'F_R_LPG' else 'T_prop'
-        base = cost_df.loc[
-            (cost_df['period'] == period_val) & (cost_df['Tech Name'] == lookup), 'value'
-        ].squeeze()
-        return ((base * mmbtuconvertor) * currencyadjustment) * defl25
+        return ('R_prop' if tech == 'F_R_LPG' else 'T_prop'), 'deflation_2025', 1.0
 
     if 'E_coal' in tech_name:
-        base = cost_df.loc[
-            (cost_df['period'] == period_val) & (cost_df['Tech Name'] == 'I_coal'), 'value'
-        ].squeeze()
-        return ((base * mmbtuconvertor) * currencyadjustment) * defl25
+        return 'I_coal', 'deflation_2025', 1.0
     if 'E_gsl' in tech_name:
-        base = cost_df.loc[
-            (cost_df['period'] == period_val) & (cost_df['Tech Name'] == 'T_gsl'), 'value'
-        ].squeeze()
-        return ((base * mmbtuconvertor) * currencyadjustment) * defl25
+        return 'T_gsl', 'deflation_2025', 1.0
     if 'R_oil' in tech_name:
-        base = cost_df.loc[
-            (cost_df['period'] == period_val) & (cost_df['Tech Name'] == 'C_oil'), 'value'
-        ].squeeze()
-        return ((base * mmbtuconvertor) * currencyadjustment) * defl25
+        return 'C_oil', 'deflation_2025', 1.0
     if 'C_h2' in tech_name or 'R_h2' in tech_name:
-        base = cost_df.loc[
-            (cost_df['period'] == period_val) & (cost_df['Tech Name'] == 'I_h2'), 'value'
-        ].squeeze()
-        return ((base * mmbtuconvertor) * currencyadjustment) * defl25
+        return 'I_h2', 'deflation_2025', 1.0
     if 'I_pcoke' in tech_name or 'I_coke' in tech_name:
-        base = cost_df.loc[
-            (cost_df['period'] == period_val) & (cost_df['Tech Name'] == 'I_coal'), 'value'
-        ].squeeze()
-        return ((base * mmbtuconvertor) * currencyadjustment) * defl25
-    if any(x in tech_name for x in ['A_ng', 'A_dsl', 'A_prop']):
-        if 'A_ng' in tech_name:
-            base = cost_df.loc[
-                (cost_df['period'] == period_val) & (cost_df['Tech Name'] == 'I_ng'), 'value'
-            ].squeeze()
-        elif 'A_dsl' in tech_name:
-            base = cost_df.loc[
-                (cost_df['period'] == period_val) & (cost_df['Tech Name'] == 'T_dsl'), 'value'
-            ].squeeze()
-        else:
-            base = cost_df.loc[
-                (cost_df['period'] == period_val) & (cost_df['Tech Name'] == 'T_prop'), 'value'
-            ].squeeze()
-        return ((base * mmbtuconvertor) * currencyadjustment) * defl25
+        return 'I_coal', 'deflation_2025', 1.0
+    if 'A_ng' in tech_name:
+        return 'I_ng', 'deflation_2025', 1.0
+    if 'A_dsl' in tech_name:
+        return 'T_dsl', 'deflation_2025', 1.0
+    if 'A_prop' in tech_name:
+        return 'T_prop', 'deflation_2025', 1.0
 
     # Default lookup straight from name
-    base = cost_df.loc[
-        (cost_df['period'] == period_val) & (cost_df['Tech Name'] == tech_name), 'value'
-    ].squeeze()
-    return ((base * mmbtuconvertor) * currencyadjustment) * defl25
+    return tech_name, 'deflation_2025', 1.0
 
 
-def build_costvariable(
-    comb_dict: Dict[str, pd.DataFrame],
+def fixed_prices(config: dict, factors: dict) -> Dict[str, float]:
+    """The :data:`FIXED_PRICES`: ``u_price``/``b_price`` from params.yaml, the rest from ``factors``."""
+    return {'u_price': config['u_price'], 'b_price': config['b_price'],
+            **{k: factors[k] for k in ('eth_price', 'rdsl_price', 'spk_price')}}
+
+
+def eia_prices(cost_df: pd.DataFrame) -> Dict[Tuple[str, int], float]:
+    """Map ``(Tech Name, period)`` to the EIA value.
+
+    Several series can map to one tech name (e.g. Diesel Fuel and Distillate
+    Fuel Oil are both ``dsl``); the first row of ``cost_df`` wins.
+    """
+    prices: Dict[Tuple[str, int], float] = {}
+    for per, name, val in zip(cost_df['period'], cost_df['Tech Name'], cost_df['value']):
+        prices.setdefault((str(name), int(per)), float(val))
+    return prices
+
+
+def _calc_value(
+    tech: str,
+    tech_name: str,
+    period_val: int,
     *,
-    cost_df: pd.DataFrame,
+    eia: Dict[Tuple[str, int], float],
+    prices: dict,
+    factors: dict,
+) -> float:
+    """Price one CostVariable row; ``prices`` holds the :data:`FIXED_PRICES`."""
+    key, deflator, extra = price_source(tech, tech_name)
+    base = prices[key] if key in FIXED_PRICES else eia.get((key, period_val), float('nan'))
+    if not deflator:
+        return base
+    return ((base * factors['mmbtuconvertor']) * factors['currencyadjustment']) * factors[deflator] * extra
+
+
+def costvariable_keys(
     tech_list: List[str],
     mapping: Dict[str, Dict[str, str]],
     province_list: List[str],
     periods: List[int],
-    dict_id: Dict[str, str],
-    factors: dict,
-    fuel_df: pd.DataFrame,
-) -> Dict[str, pd.DataFrame]:
-    """Append CostVariable rows across provinces, vintages, and periods."""
-    cdf = cost_df.copy()
-    cdf['period'] = cdf['period'].astype(int)
-    cdf['Tech Name'] = cdf['Tech Name'].astype(str)
-    cdf['value'] = cdf['value'].astype(float)
-
-    # --- fix: drop duplicate column names in fuel_df ---
-    fuel_df = fuel_df.loc[:, ~fuel_df.columns.duplicated()].copy()
-    for col in ("Commodity", "notes", "source"):
-        if col not in fuel_df.columns:
-            fuel_df[col] = ""
-
-    rows = []
+) -> List[Tuple[str, int, str, int, str]]:
+    """Return ``(region, period, tech, vintage, output commodity)`` per CostVariable row."""
+    keys = []
     for pro in province_list:
         if pro == 'CAN':
             continue
@@ -133,34 +116,38 @@ def build_costvariable(
                 for tech in tech_list:
                     if any(x in tech for x in ['F_IMP', 'ELC', 'OTH']):
                         continue
-                    tech_name = mapping[tech]['output'].strip()
-                    val = _calc_value(
-                        tech,
-                        tech_name,
-                        int(per),
-                        cost_df=cdf,
-                        cfg={'b_price': 0, 'u_price': 0},
-                        mmbtuconvertor=factors['mmbtuconvertor'],
-                        currencyadjustment=factors['currencyadjustment'],
-                        defl22=factors['deflation_2022'],
-                        defl25=factors['deflation_2025'],
-                        eth_price=factors['eth_price'],
-                        rdsl_price=factors['rdsl_price'],
-                        spk_price=factors['spk_price'],
-                    )
-                    unit = "2020 M$/PJ"
-
-                    # Safe scalar extraction
-                    match = fuel_df.loc[fuel_df['Commodity'] == tech_name]
-                    if not match.empty:
-                        notes = match['notes'].iloc[0] if not isinstance(match['notes'], pd.DataFrame) else match['notes'].iloc[0, 0]
-                        ref   = match['source'].iloc[0] if not isinstance(match['source'], pd.DataFrame) else match['source'].iloc[0, 0]
-                    else:
-                        notes, ref = '', ''
-
-                    rows.append(
-                        [pro, per, tech, vint, val, unit, notes, ref, 2, 3, 2, 1, 1, dict_id[pro]]
-                    )
+                    keys.append((pro, per, tech, vint, mapping[tech]['output'].strip()))
+    return keys
+
+
+def build_costvariable(
+    comb_dict: Dict[str, pd.DataFrame],
+    *,
+    cost_df: pd.DataFrame,
+    tech_list: List[str],
+    mapping: Dict[str, Dict[str, str]],
+    province_list: List[str],
+    periods: List[int],
+    dict_id: Dict[str, str],
+    factors: dict,
+    notes: Dict[str, Tuple[str, str]],
+    config: dict,
+) -> Dict[str, pd.DataFrame]:
+    """Append CostVariable rows across provinces, vintages, and periods.
+
+    ``notes`` maps an output commodity to its ``(notes, source)`` pair;
+    ``config`` supplies the uranium and biomass prices.
+    """
+    eia = eia_prices(cost_df)
+
+    prices = fixed_prices(config, factors)
+
+    rows = []
+    for pro, per, tech, vint, tech_name in costvariable_keys(tech_list, mapping, province_list, periods):
+        val = _calc_value(tech, tech_name, int(per), eia=eia, prices=prices, factors=factors)
+        unit = "2020 M$/PJ"
+        note, ref = notes.get(tech_name, ('', ''))
+        rows.append([pro, per, tech, vint, val, unit, note, ref, 2, 3, 2, 1, 1, dict_id[pro]])
 
     out = pd.DataFrame(rows, columns=comb_dict['CostVariable'].columns)
     if not out.empty:
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+
+@author: david
+"""
+"""Dependency-aware stage scheduler for the fuel pipeline.
+
+Each :class:`Stage` declares the artifacts it consumes (``inputs``) and the
+artifacts it produces (``outputs``). :func:`run_stages` resolves the DAG from
+those declarations and submits every stage as soon as its inputs exist:
+``'thread'`` stages (I/O, SQLite writes) share a thread pool and
+``'process'`` stages (CPU-heavy builders) go to a process pool.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import logging
+import multiprocessing
+import time
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+REGISTRY = 'schema'
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One node of the pipeline DAG.
+
+    Parameters
+    ----------
+    name
+        Unique stage name (used in logs and the critical path).
+    func
+        Callable run with keyword arguments. Must be a module-level function
+        when ``executor='process'`` so it can be pickled.
+    inputs
+        ``{keyword: artifact}`` mapping of upstream artifacts passed to ``func``.
+    outputs
+        Artifact names produced. With more than one, ``func`` returns a tuple.
+    executor
+        ``'thread'`` or ``'process'``.
+    tables
+        Registry tables the stage populates; it receives them as ``comb_dict``,
+        copied out of the ``schema`` artifact, so concurrent builders never
+        share a registry.
+    static
+        Constant keyword arguments.
+    after
+        Stages that must finish first although ``func`` takes nothing from
+        them (e.g. a write that has to land after another one).
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: Dict[str, str] = field(default_factory=dict)
+    outputs: Tuple[str, ...] = ()
+    executor: str = 'thread'
+    tables: Tuple[str, ...] = ()
+    static: Dict[str, Any] = field(default_factory=dict)
+    after: Tuple[str, ...] = ()
+
+
+def _dependencies(stages: List[Stage]) -> Dict[str, List[str]]:
+    """Map each stage to the stages producing its inputs; validate the DAG."""
+    producers: Dict[str, str] = {}
+    for st in stages:
+        if st.executor not in ('thread', 'process'):
+            raise ValueError(f"Stage {st.name!r}: unknown executor {st.executor!r}")
+        for art in st.outputs:
+            if art in producers:
+                raise ValueError(f"Artifact {art!r} produced by both {producers[art]!r} and {st.name!r}")
+            producers[art] = st.name
+
+    names = {st.name for st in stages}
+    deps: Dict[str, List[str]] = {}
+    for st in stages:
+        needed = list(st.inputs.values()) + ([REGISTRY] if st.tables else [])
+        missing = [a for a in needed if a not in producers]
+        if missing:
+            raise ValueError(f"Stage {st.name!r} needs artifacts nobody produces: {missing}")
+        unknown = [n for n in st.after if n not in names]
+        if unknown:
+            raise ValueError(f"Stage {st.name!r} runs after unknown stages: {unknown}")
+        deps[st.name] = sorted({producers[a] for a in needed} | set(st.after))
+
+    # Kahn's algorithm, only to reject cycles before anything is submitted
+    remaining = {name: set(d) for name, d in deps.items()}
+    while remaining:
+        ready = [name for name, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f"Cycle between stages: {sorted(remaining)}")
+        for name in ready:
+            del remaining[name]
+        for d in remaining.values():
+            d.difference_update(ready)
+    return deps
+
+
+def prune(stages: List[Stage], keep: Iterable[str]) -> List[Stage]:
+    """Return the stages named in ``keep`` plus everything they depend on.
+
+    Declaration order is preserved; stages nothing in ``keep`` needs are
+    dropped and never run.
+    """
+    deps = _dependencies(stages)
+    needed = set()
+    todo = list(keep)
+    while todo:
+        name = todo.pop()
+        if name not in deps:
+            raise ValueError(f"Unknown stage {name!r}")
+        if name not in needed:
+            needed.add(name)
+            todo.extend(deps[name])
+    return [st for st in stages if st.name in needed]
+
+
+def _timed(func: Callable[..., Any], kwargs: Dict[str, Any]) -> Tuple[float, float, Any]:
+    """Run ``func`` in the worker and return ``(start, end, result)``.
+
+    Wall-clock time, so the stamps taken in spawned processes line up with
+    the scheduler's; time spent queued in a busy pool is not counted.
+    """
+    start = time.time()
+    result = func(**kwargs)
+    return start, time.time(), result
+
+
+def run_stages(stages: List[Stage], *, max_workers: int | None = None) -> Tuple[Dict[str, Any], Dict[str, Tuple[float, float]]]:
+    """Execute ``stages`` concurrently in dependency order.
+
+    Returns
+    -------
+    (dict, dict)
+        ``(artifacts, timings)`` where ``timings[name] = (start, end)`` in
+        seconds since the scheduler started, measured inside the worker.
+    """
+    deps = _dependencies(stages)
+    by_name = {st.name: st for st in stages}
+    artifacts: Dict[str, Any] = {}
+    timings: Dict[str, Tuple[float, float]] = {}
+    t0 = time.time()
+
+    # 'spawn' everywhere: forking while pool threads hold locks can deadlock
+    ctx = multiprocessing.get_context('spawn')
+    with ThreadPoolExecutor(max_workers=max_workers) as threads, \
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as procs:
+        pending = dict(by_name)
+        running: Dict[Future, Tuple[Stage, float]] = {}
+        while pending or running:
+            for name in [n for n in pending if all(d in timings for d in deps[n])]:
+                st = pending.pop(name)
+                kwargs = {kw: artifacts[art] for kw, art in st.inputs.items()}
+                if st.tables:
+                    kwargs['comb_dict'] = {t: artifacts[REGISTRY][t].copy() for t in st.tables}
+                kwargs.update(st.static)
+                pool = procs if st.executor == 'process' else threads
+                running[pool.submit(_timed, st.func, kwargs)] = (st, time.time() - t0)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                st, submitted = running.pop(fut)
+                start, end, result = fut.result()
+                if len(st.outputs) == 1:
+                    artifacts[st.outputs[0]] = result
+                elif st.outputs:
+                    artifacts.update(zip(st.outputs, result))
+                timings[st.name] = (start - t0, end - t0)
+                # Queue wait (busy pool, process spawn) is reported, not timed as work
+                logging.info("Stage %-24s %7.2fs (queued %.2fs)", st.name, end - start,
+                             max(0.0, start - t0 - submitted))
+
+    return artifacts, timings
+
+
+def critical_path(stages: List[Stage], timings: Dict[str, Tuple[float, float]]) -> List[str]:
+    """Return the chain of stages that bounded the wall time.
+
+    Starts from the stage that finished last and walks back through whichever
+    dependency finished last, i.e. the one that actually gated each start.
+    """
+    deps = _dependencies(stages)
+    name = max(timings, key=lambda n: timings[n][1])
+    path = [name]
+    while deps[name]:
+        name = max(deps[name], key=lambda n: timings[n][1])
+        path.append(name)
+    return path[::-1]
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:21:37 2026
+
+@author: david
+"""
+"""Monte Carlo price-sensitivity samples of CostVariable.
+
+Every CostVariable row is ``price * conversion`` where ``price`` is either an
+EIA series value or one of the fixed prices (see
+:func:`costvariable.price_source`). Rows are therefore resolved once to a
+price column and a conversion factor, price multipliers are drawn for all
+samples with a seeded NumPy generator, and the whole ``(sample x row)`` cost
+matrix is evaluated in a single array expression.
+
+Distributions are multiplicative factors on the nominal price, declared in
+``params.yaml`` under ``sensitivity.distributions`` and keyed by a fixed price
+(``u_price``, ``b_price``, ``eth_price``, ``rdsl_price``, ``spk_price``), an
+EIA ``Tech Name`` (e.g. ``T_ng``), or ``eia`` as the default distribution
+for EIA series without their own entry. Every series is drawn independently;
+one draw scales all of its periods.
+"""
+from typing import Dict, List
+import sqlite3
+import numpy as np
+import pandas as pd
+
+from costvariable import FIXED_PRICES, costvariable_keys, eia_prices, fixed_prices, price_source
+
+LAYOUTS = ('data_id', 'wide')
+SAMPLE_TABLE = 'CostVariableSample'
+# Sample columns per CostVariableSample row; SQLite caps a table at 2000 columns
+SAMPLE_BLOCK = 1000
+SAMPLE_DATASET = 'CostVariable price-sensitivity sample'
+SAMPLE_ID_GLOB = '*MC[0-9][0-9][0-9][0-9]*'
+
+
+def _draw(rng: np.random.Generator, spec: dict | None, n: int) -> np.ndarray:
+    """Draw ``n`` price multipliers; no spec means the price is held fixed."""
+    if not spec:
+        return np.ones(n)
+    dist = spec['dist']
+    if dist == 'normal':
+        return rng.normal(spec.get('mean', 1.0), spec['sd'], n)
+    if dist == 'lognormal':
+        return rng.lognormal(0.0, spec['sigma'], n)
+    if dist == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], n)
+    if dist == 'triangular':
+        return rng.triangular(spec['low'], spec.get('mode', 1.0), spec['high'], n)
+    raise ValueError(f"Unknown sensitivity distribution {dist!r}")
+
+
+def sample_costvariable(
+    *,
+    cost_df: pd.DataFrame,
+    tech_list: List[str],
+    mapping: Dict[str, Dict[str, str]],
+    province_list: List[str],
+    periods: List[int],
+    factors: dict,
+    prices: dict,
+    distributions: Dict[str, dict],
+    n_samples: int,
+    seed: int | None = None,
+) -> tuple:
+    """Evaluate CostVariable for ``n_samples`` price draws at once.
+
+    Returns
+    -------
+    (list, ndarray)
+        ``(keys, costs)``: the ``(region, period, tech, vintage, output)`` row
+        keys from :func:`costvariable.costvariable_keys` and the
+        ``(n_samples, len(keys))`` cost matrix.
+    """
+    keys = costvariable_keys(tech_list, mapping, province_list, periods)
+    eia = eia_prices(cost_df)
+
+    # Resolve each row to a price column (nominal value + price series)
+    columns: Dict[tuple, int] = {}
+    nominal, series = [], []
+    col_idx = np.empty(len(keys), dtype=np.intp)
+    deflator = np.ones(len(keys))
+    extra = np.ones(len(keys))
+    convert = np.zeros(len(keys), dtype=bool)
+    for i, (_, per, tech, _, tech_name) in enumerate(keys):
+        key, defl, mult = price_source(tech, tech_name)
+        col = (key,) if key in FIXED_PRICES else (key, int(per))
+        if col not in columns:
+            columns[col] = len(nominal)
+            nominal.append(prices[key] if key in FIXED_PRICES else eia.get(col, np.nan))
+            series.append(key)
+        col_idx[i] = columns[col]
+        if defl:
+            convert[i] = True
+            deflator[i] = factors[defl]
+            extra[i] = mult
+
+    # One independent multiplier per series (all its periods), drawn in
+    # sorted order so a seed reproduces; 'eia' is the default distribution
+    rng = np.random.default_rng(seed)
+    default = distributions.get('eia')
+    draws = {
+        name: _draw(rng, distributions.get(name, None if name in FIXED_PRICES else default), n_samples)
+        for name in sorted(set(series))
+    }
+    multipliers = np.column_stack([draws[k] for k in series]) if series else np.empty((n_samples, 0))
+    price = multipliers * np.asarray(nominal, dtype=float)
+
+    base = price[:, col_idx]
+    converted = ((base * factors['mmbtuconvertor']) * factors['currencyadjustment']) * deflator * extra
+    return keys, np.where(convert, converted, base)
+
+
+def build_costvariable_samples(
+    comb_dict: Dict[str, pd.DataFrame],
+    *,
+    cost_df: pd.DataFrame,
+    tech_list: List[str],
+    mapping: Dict[str, Dict[str, str]],
+    province_list: List[str],
+    periods: List[int],
+    dict_id: Dict[str, str],
+    factors: dict,
+    notes: Dict[str, tuple],
+    config: dict,
+    n_samples: int,
+    seed: int | None = None,
+    layout: str | None = None,
+) -> Dict[str, pd.DataFrame]:
+    """Build sampled CostVariable rows in one of two layouts.
+
+    ``'data_id'`` appends every sample to ``CostVariable`` under its own
+    ``<data_id>MC<nnnn>`` data set (with matching ``DataSet`` rows);
+    ``'wide'`` returns a single :data:`SAMPLE_TABLE` frame with one row per
+    ``(region, period, tech, vintage, block)`` and one cost column per sample
+    (``s0000`` ...), in 2020 M$/PJ. Sample ``block * SAMPLE_BLOCK + j`` is
+    column ``s<j>``; columns past the last sample are left empty.
+    ``seed`` and ``layout`` fall back to the ``sensitivity`` block of the
+    config.
+    """
+    sens = config.get('sensitivity') or {}
+    seed = sens.get('seed') if seed is None else seed
+    layout = layout or sens.get('layout', 'data_id')
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown sensitivity layout {layout!r}; expected one of {LAYOUTS}")
+
+    keys, costs = sample_costvariable(
+        cost_df=cost_df, tech_list=tech_list, mapping=mapping, province_list=province_list, periods=periods,
+        factors=factors, prices=fixed_prices(config, factors), distributions=sens.get('distributions') or {},
+        n_samples=n_samples, seed=seed,
+    )
+    region, period, tech, vintage, output = (list(col) for col in zip(*keys)) if keys else ([],) * 5
+
+    def tile(values: list) -> pd.Categorical:
+        # Repeated text as categorical codes; NaN notes stay missing
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        return pd.Categorical.from_codes(np.tile(codes, n_samples), uniques)
+
+    if layout == 'wide':
+        # One REAL column per sample: a row binds ~1000 costs instead of one
+        width = min(n_samples, SAMPLE_BLOCK)
+        n_blocks = -(-n_samples // width)
+        padded = np.full((n_blocks * width, len(keys)), np.nan)
+        padded[:n_samples] = costs
+        wide = padded.reshape(n_blocks, width, len(keys)).transpose(0, 2, 1).reshape(-1, width)
+        key_df = pd.DataFrame({
+            'region': np.tile(np.asarray(region, dtype=object), n_blocks),
+            'period': np.tile(period, n_blocks),
+            'tech': np.tile(np.asarray(tech, dtype=object), n_blocks),
+            'vintage': np.tile(vintage, n_blocks),
+            'block': np.repeat(np.arange(n_blocks), len(keys)),
+        })
+        sample_df = pd.DataFrame(wide, columns=[f's{j:04d}' for j in range(width)])
+        comb_dict[SAMPLE_TABLE] = pd.concat([key_df, sample_df], axis=1)
+        return comb_dict
+
+    # data_id per (sample, region) without formatting one string per row
+    reg_codes, regions = pd.factorize(pd.Series(region, dtype=object))
+    sample_ids = pd.Categorical.from_codes(
+        (np.arange(n_samples)[:, None] * len(regions) + reg_codes).ravel(),
+        [f"{dict_id[pro]}MC{i:04d}" for i in range(n_samples) for pro in regions],
+    )
+    note_ref = [notes.get(o, ('', '')) for o in output]
+    cols = comb_dict['CostVariable'].columns
+    out = pd.DataFrame({
+        cols[0]: tile(region),
+        cols[1]: np.tile(period, n_samples),
+        cols[2]: tile(tech),
+        cols[3]: np.tile(vintage, n_samples),
+        cols[4]: costs.ravel(),
+        cols[5]: "2020 M$/PJ",
+        cols[6]: tile([n for n, _ in note_ref]),
+        cols[7]: tile([r for _, r in note_ref]),
+        cols[8]: 2, cols[9]: 3, cols[10]: 2, cols[11]: 1, cols[12]: 1,
+        cols[13]: sample_ids,
+    })
+    # Concatenating onto the empty registry frame would decategorize millions of rows
+    if comb_dict['CostVariable'].empty:
+        comb_dict['CostVariable'] = out
+    else:
+        comb_dict['CostVariable'] = pd.concat([comb_dict['CostVariable'], out], ignore_index=True)
+
+    ds_rows = [
+        [f"{dict_id[pro]}MC{i:04d}", f'{pro} - fuel MC sample {i}', f"v{config['version']}",
+         SAMPLE_DATASET, 'active', '', '', dict_id[pro], '', f'seed={seed}']
+        for i in range(n_samples) for pro in province_list if pro != 'CAN'
+    ]
+    ds_df = pd.DataFrame(ds_rows, columns=comb_dict['DataSet'].columns)
+    comb_dict['DataSet'] = pd.concat([comb_dict['DataSet'], ds_df], ignore_index=True)
+    return comb_dict
+
+
+def clear_samples(conn: sqlite3.Connection) -> None:
+    """Delete samples left by an earlier run (both layouts) through ``conn``.
+
+    Sample data sets are matched by their ``<data_id>MC<nnnn>`` id, so this
+    works whether or not ``DataSet`` has already been emptied. Nothing is
+    committed here: the caller's transaction decides.
+    """
+    # DELETE opens the transaction (sqlite3 does not for DDL), so the DROP joins it
+    for table in ('CostVariable', 'DataSet'):
+        conn.execute(f"DELETE FROM {table} WHERE data_id GLOB ?", (SAMPLE_ID_GLOB,))
+    conn.execute(f'DROP TABLE IF EXISTS "{SAMPLE_TABLE}"')
\ No newline at end of file
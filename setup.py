@@ -19,6 +19,8 @@ import sqlite3
 import yaml
 import pandas as pd
 
+from catalog import load_dataset
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
@@ -40,9 +42,15 @@ def load_config(path: str | Path = "input/params.yaml") -> dict:
         return yaml.safe_load(fh)
 
 
-def init_database(config: dict, output_dir: str | Path = "output", db_name: str = "CAN_fuel.sqlite") -> Tuple[Path, List[str], Dict[str, pd.DataFrame]]:
+def init_database(config: dict, output_dir: str | Path = "output", db_name: str = "CAN_fuel.sqlite", replace: List[str] | None = None) -> Tuple[Path, List[str], Dict[str, pd.DataFrame]]:
     """Create a new SQLite DB from schema and return empty table registry.
 
+    With ``replace``, an existing DB is opened as is: the listed tables are
+    emptied only when their new rows are written (see ``aggregator``), so a
+    failed selective run leaves the previous rows in place. Raises
+    ``ValueError`` if a listed table is missing from that DB (e.g. it was
+    built from an older schema).
+
     Returns
     -------
     (Path, list[str], dict[str, DataFrame])
@@ -57,13 +65,24 @@ def init_database(config: dict, output_dir: str | Path = "output", db_name: str
     schema_file = Path("input") / (f"schema_{version}.sql" if version != 31 else "schema_3_1.sql")
     schema_sql = schema_file.read_text(encoding="utf-8")
 
+    keep = replace is not None and db_path.exists()
+
     # Recreate DB
-    if db_path.exists():
+    if db_path.exists() and not keep:
         db_path.unlink()
 
     with sqlite3.connect(db_path) as conn:
         cur = conn.cursor()
-        cur.executescript(schema_sql)
+        if keep:
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table';")
+            missing = sorted(set(replace) - {r[0] for r in cur.fetchall()})
+            if missing:
+                raise ValueError(
+                    f"{db_path} has no table(s) {missing}; delete it to rebuild it from {schema_file.name}"
+                )
+            logging.info("Replacing tables in %s: %s", db_path, ", ".join(replace))
+        else:
+            cur.executescript(schema_sql)
         cur.execute("SELECT name FROM sqlite_master WHERE type='table';")
         tables = [r[0] for r in cur.fetchall()]
 
@@ -76,8 +95,8 @@ def init_database(config: dict, output_dir: str | Path = "output", db_name: str
     return db_path, tables, comb_dict
 
 
-def build_runtime_frames(df_raw: pd.DataFrame, config: dict) -> Tuple[pd.DataFrame, pd.DataFrame, List[str], pd.DataFrame, List[str], Dict[str, str]]:
-    """Reproduce your original transformations into cost_df/fuel_df/etc.
+def build_cost_frame(df_raw: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """Reproduce your original transformations of the raw EIA table into cost_df.
 
     Parameters
     ----------
@@ -85,11 +104,6 @@ def build_runtime_frames(df_raw: pd.DataFrame, config: dict) -> Tuple[pd.DataFra
         Raw EIA dataframe from the API/cache.
     config
         Global configuration from YAML.
-
-    Returns
-    -------
-    tuple
-        ``(cost_df, fuel_df, fuel_list, province_list, periods, dict_id)``
     """
     df = df_raw.copy()
 
@@ -123,14 +137,44 @@ def build_runtime_frames(df_raw: pd.DataFrame, config: dict) -> Tuple[pd.DataFra
     cost_df = df[['period', 'sector_code', 'fuel_code', 'Tech Name', 'value', 'unit']].copy()
     cost_df = cost_df.sort_values(by='period', ascending=True).reset_index(drop=True)
 
-    # Fuel list from CSV
-    fuel_df = pd.read_csv('input/fuel_list.csv')
+    return cost_df
+
+
+def build_run_dimensions(config: dict, fuel_df: pd.DataFrame | None = None) -> Tuple[pd.DataFrame, List[str], List[str], List[str], Dict[str, str]]:
+    """Fuel list, provinces, periods and data ids; needs no EIA data.
+
+    Parameters
+    ----------
+    config
+        Global configuration from YAML.
+    fuel_df
+        Validated ``fuel_list`` frame from the input catalog (loaded if None).
+
+    Returns
+    -------
+    tuple
+        ``(fuel_df, fuel_list, province_list, periods, dict_id)``
+    """
+    # Fuel list from the input catalog
+    if fuel_df is None:
+        fuel_df = load_dataset('fuel_list')
     fuel_list = fuel_df['Commodity'].to_list()
 
     province_list = ['AB', 'ON', 'BC', 'MB', 'SK', 'QC', 'CAN']
     dict_id = {pro: (f"{pro}DIST{config['version']}" if pro != 'CAN' else f"GENDIST{config['version']}") for pro in province_list}
 
-    return cost_df, fuel_df, fuel_list, province_list, config['periods'], dict_id
+    return fuel_df, fuel_list, province_list, config['periods'], dict_id
+
+
+def build_runtime_frames(df_raw: pd.DataFrame, config: dict, fuel_df: pd.DataFrame | None = None) -> Tuple[pd.DataFrame, pd.DataFrame, List[str], List[str], List[str], Dict[str, str]]:
+    """Combine :func:`build_cost_frame` and :func:`build_run_dimensions`.
+
+    Returns
+    -------
+    tuple
+        ``(cost_df, fuel_df, fuel_list, province_list, periods, dict_id)``
+    """
+    return (build_cost_frame(df_raw, config), *build_run_dimensions(config, fuel_df))
 
 # Expose constants that were previously globals in setup.py (so other modules can import)
 def inflation_constants() -> dict:
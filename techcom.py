@@ -26,12 +26,15 @@ def _sectors_map() -> Dict[str, str]:
 def build_comm_and_tech(
     comb_dict: Dict[str, pd.DataFrame],
     *,
-    cost_df: pd.DataFrame,
+    cost_df: pd.DataFrame | None = None,
     fuel_df: pd.DataFrame,
     fuel_list: List[str],
     dict_id: Dict[str, str],
 ) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
-    """Populate ``Commodity`` and ``Technology``; return the tech list."""
+    """Populate ``Commodity`` and ``Technology``; return the tech list.
+
+    ``cost_df`` is not used and may be omitted (no EIA data is needed here).
+    """
     sectors = _sectors_map()
     fuels = fuel_df.set_index('Fuel_type')['Fuel_name'].to_dict()
 